@@ -2,9 +2,24 @@
 Core package for the Excel AI Modifier application
 """
 
-from .config import settings, SAMPLE_RULES
+from .config import (
+    settings,
+    SAMPLE_RULES,
+    AVAILABLE_TYPES,
+    NEW_COLUMNS,
+    COVERAGE_KEYS_BY_TYPE,
+    derive_rule_indexes,
+    freeze_rules,
+    unfreeze_rules
+)
 
 __all__ = [
     "settings",
-    "SAMPLE_RULES"
+    "SAMPLE_RULES",
+    "AVAILABLE_TYPES",
+    "NEW_COLUMNS",
+    "COVERAGE_KEYS_BY_TYPE",
+    "derive_rule_indexes",
+    "freeze_rules",
+    "unfreeze_rules"
 ]
@@ -3,7 +3,8 @@ Configuration settings for the Excel AI Modifier application
 """
 
 import os
-from typing import Dict, Any
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Tuple
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -20,9 +21,23 @@ class Settings:
     
     # OpenAI Configuration
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
-    OPENAI_MODEL: str = "gpt-3.5-turbo"
+    OPENAI_MODEL: str = "gpt-4o-mini"
     OPENAI_MAX_TOKENS: int = 100
     OPENAI_TEMPERATURE: float = 0.3
+    OPENAI_BATCH_MAX_TOKENS: int = 2000
+    OPENAI_BATCH_SIZE: int = 50
+    OPENAI_CACHE_SIZE: int = 4096
+    OPENAI_RESPONSE_FORMAT: dict = {"type": "json_object"}
+    OPENAI_USE_FUNCTIONS: bool = True
+    OPENAI_MAX_REQUESTS_PER_MINUTE: int = int(os.getenv("OPENAI_MAX_REQUESTS_PER_MINUTE", "3500"))
+    OPENAI_MAX_TOKENS_PER_MINUTE: int = int(os.getenv("OPENAI_MAX_TOKENS_PER_MINUTE", "90000"))
+    OPENAI_RATE_LIMIT_RETRIES: int = 5
+    OPENAI_RATE_LIMIT_BACKOFF: float = 1.0  # Seconds, doubled after each rate limit error
+    OPENAI_MAX_CONNECTIONS: int = 128
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = 64
+    OPENAI_KEEPALIVE_EXPIRY: float = 60.0
+    OPENAI_TIMEOUT: float = 30.0
+    OPENAI_CONNECT_TIMEOUT: float = 5.0
     
     # Threading Configuration
     MAX_WORKERS: int = 5
@@ -34,13 +49,17 @@ class Settings:
     CORS_HEADERS: list = ["*"]
     
     # File Processing Configuration
-    SUPPORTED_FILE_EXTENSIONS: list = ['.xlsx']
+    SUPPORTED_FILE_EXTENSIONS: frozenset = frozenset({'.xlsx'})
     MAX_HEADER_SEARCH_ROWS: int = 5
     DEFAULT_HEADER_ROW: int = 1
     TARGET_COLUMN: str = "TIPO DE UNIDAD"
+    UPLOAD_CHUNK_SIZE: int = 1 << 20
+    DOWNLOAD_CHUNK_SIZE: int = 1 << 20
     
     # Excel Configuration
     NEW_COLUMN_WIDTH: int = 15
+    MAX_STYLED_ROWS: int = int(os.getenv("MAX_STYLED_ROWS", "10000"))  # Larger sheets are written values-only
+    BULK_CLEAR_MIN_ROWS: int = 1000  # Larger ranges are cleared from the stored cells
 
 # Create settings instance
 settings = Settings()
@@ -116,3 +135,48 @@ SAMPLE_RULES: Dict[str, Any] = {
         ]
     }
 }
+
+
+def freeze_rules(value: Any) -> Any:
+    """
+    Return a deeply read-only copy of a rules structure: mappings become
+    read-only views and lists become tuples, at every level
+    """
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: freeze_rules(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze_rules(item) for item in value)
+    return value
+
+
+def unfreeze_rules(value: Any) -> Any:
+    """
+    Return a plain dict/list copy of a rules structure, e.g. to serialize it as JSON
+    """
+    if isinstance(value, Mapping):
+        return {key: unfreeze_rules(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [unfreeze_rules(item) for item in value]
+    return value
+
+
+def derive_rule_indexes(rules: Mapping[str, Any]) -> Tuple[Tuple[str, ...], Tuple[str, ...], Dict[str, Tuple[str, ...]]]:
+    """
+    Derive the lookups the enrichment pipeline needs from a rules mapping:
+    available vehicle types, columns to add, and coverage names per vehicle type
+    """
+    available_types = tuple(rules["coberturas_por_tipo"].keys())
+    new_columns = tuple(rules["reglas_asignacion"]["columnas_a_agregar"])
+    coverage_keys_by_type = {
+        vehicle_type: tuple(type_rules["coberturas"].keys())
+        for vehicle_type, type_rules in rules["coberturas_por_tipo"].items()
+    }
+    return available_types, new_columns, coverage_keys_by_type
+
+
+# Read-only at every level, so the shared rules and the indexes derived from them can't drift apart
+SAMPLE_RULES: Mapping[str, Any] = freeze_rules(SAMPLE_RULES)
+
+# Precomputed once at import time so requests never re-traverse the sample rules
+AVAILABLE_TYPES, NEW_COLUMNS, COVERAGE_KEYS_BY_TYPE = derive_rule_indexes(SAMPLE_RULES)
+COVERAGE_KEYS_BY_TYPE = MappingProxyType(COVERAGE_KEYS_BY_TYPE)
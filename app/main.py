@@ -6,6 +6,7 @@ Main application entry point using modular architecture
 import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from .core.config import settings
 from .routes import health_router, excel_router
@@ -18,7 +19,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title=settings.API_TITLE,
     version=settings.API_VERSION,
-    description="Handles Excel file processing and AI-based data enrichment"
+    description="Handles Excel file processing and AI-based data enrichment",
+    default_response_class=ORJSONResponse
 )
 
 # Enable CORS for frontend communication
@@ -3,7 +3,7 @@ Pydantic models and schemas for the Excel AI Modifier application
 """
 
 from pydantic import BaseModel
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, NamedTuple, Optional
 
 
 class APIResponse(BaseModel):
@@ -24,12 +24,12 @@ class InsuranceValues(BaseModel):
     DEDUCIBLES: str
 
 
-class VehicleInfo(BaseModel):
-    """Vehicle information model"""
+class VehicleInfo(NamedTuple):
+    """Vehicle information model (a lightweight tuple, built once per unique vehicle)"""
     description: str
     type: str
-    year: Optional[str] = ""
-    model: Optional[str] = ""
+    year: str = ""
+    model: str = ""
 
 
 class EnrichmentResult(BaseModel):
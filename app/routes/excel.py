@@ -2,42 +2,63 @@
 Excel processing routes
 """
 
-import pandas as pd
+import asyncio
 import io
 import os
 import logging
+from typing import Iterator, Tuple
+import pandas as pd
+from urllib.parse import quote
 from fastapi import APIRouter, File, UploadFile, Form, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
+from openpyxl import load_workbook
 
-from ..core.config import SAMPLE_RULES
-from ..utils.excel_utils import detect_header_row, validate_excel_file, get_sheet_names
+from ..core.config import settings, SAMPLE_RULES, NEW_COLUMNS
+from ..utils.excel_utils import (
+    UNSUPPORTED_FILE_MESSAGE, detect_header_row, validate_excel_file, get_sheet_names,
+    save_upload_to_temp_file, read_sheet_header, read_sheet_dataframe
+)
 from ..services.excel_service import ExcelService
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-@router.post("/export")
-async def export_modified_excel(
-    file: UploadFile = File(...),
-    sheet_name: str = Form(...)
-):
+def _content_disposition(filename: str) -> str:
     """
-    Receives Excel file and sheet name, applies AI enrichment, and returns modified Excel
+    Build an attachment Content-Disposition header, encoding non-ASCII filenames
+    """
+    quoted_filename = quote(filename)
+    if quoted_filename != filename:
+        return f"attachment; filename*=utf-8''{quoted_filename}"
+    return f'attachment; filename="{filename}"'
+
+
+def _iter_buffer(buffer: io.BytesIO) -> Iterator[bytes]:
+    """
+    Yield a buffer in fixed-size chunks; iterating a BytesIO directly would split
+    the binary workbook on newline bytes into many irregular pieces
     """
-    temp_filename = None
+    while True:
+        chunk = buffer.read(settings.DOWNLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+def _read_sheet_data(upload_filename: str, sheet_name: str) -> Tuple[int, pd.DataFrame]:
+    """
+    Detect the header row and read the needed columns of a sheet in a single
+    read-only pass over the workbook. Blocking; run it in a worker thread.
+    """
+    try:
+        workbook = load_workbook(upload_filename, read_only=True, data_only=True)
+    except Exception as load_error:
+        logger.error(f"Error reading Excel file: {str(load_error)}")
+        raise HTTPException(status_code=400, detail="Could not read the uploaded Excel file")
     
     try:
-        # Validate file type
-        if not validate_excel_file(file.filename):
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Only {', '.join(['.xlsx'])} files are supported"
-            )
-        
-        # Read the uploaded Excel file
-        content = await file.read()
-        sheet_names = get_sheet_names(content)
+        sheet_names = get_sheet_names(workbook)
         
         # Validate sheet name exists
         if sheet_name not in sheet_names:
@@ -47,19 +68,50 @@ async def export_modified_excel(
             )
         
         # Detect the correct header row
-        header_row = detect_header_row(content, sheet_name, "TIPO DE UNIDAD")
+        worksheet = workbook[sheet_name]
+        header_row = detect_header_row(worksheet, "TIPO DE UNIDAD")
         logger.info(f"Using header row {header_row} for sheet '{sheet_name}'")
         
-        # Read the specific sheet with the correct header row
-        df = pd.read_excel(io.BytesIO(content), sheet_name=sheet_name, header=header_row)
-        
         # Log available columns for debugging
-        logger.info(f"Available columns: {list(df.columns)}")
+        available_columns = read_sheet_header(worksheet, header_row)
+        logger.info(f"Available columns: {available_columns}")
+        
+        # Read only the columns the enrichment needs; the rest stay untouched in the workbook
+        required_columns = ExcelService.get_required_columns(available_columns, SAMPLE_RULES)
+        df = read_sheet_dataframe(worksheet, header_row, usecols=required_columns)
+        
+        return header_row, df
+    finally:
+        workbook.close()
+
+
+@router.post("/export")
+async def export_modified_excel(
+    file: UploadFile = File(...),
+    sheet_name: str = Form(...)
+):
+    """
+    Receives Excel file and sheet name, applies AI enrichment, and returns modified Excel
+    """
+    upload_filename = None
+    
+    try:
+        # Validate file type
+        if not validate_excel_file(file.filename):
+            raise HTTPException(
+                status_code=400, 
+                detail=UNSUPPORTED_FILE_MESSAGE
+            )
+        
+        # Stream the uploaded Excel file to disk instead of holding it in memory;
+        # blocking file and workbook work runs in worker threads, off the event loop
+        upload_filename = await asyncio.to_thread(save_upload_to_temp_file, file.file)
+        header_row, df = await asyncio.to_thread(_read_sheet_data, upload_filename, sheet_name)
         
         # Apply AI enrichment
         try:
             logger.info("Starting AI enrichment process...")
-            enriched_df = ExcelService.apply_ai_enrichment(df, SAMPLE_RULES)
+            enriched_df = await ExcelService.apply_ai_enrichment_async(df, SAMPLE_RULES)
             logger.info("AI enrichment completed successfully")
         except Exception as enrichment_error:
             logger.error(f"Error during AI enrichment: {str(enrichment_error)}")
@@ -72,34 +124,35 @@ async def export_modified_excel(
         logger.info(f"Enriched DataFrame shape: {enriched_df.shape}")
         
         # Log sample of the new columns data
-        new_columns = SAMPLE_RULES["reglas_asignacion"]["columnas_a_agregar"]
-        for col in new_columns:
+        for col in NEW_COLUMNS:
             if col in enriched_df.columns:
                 sample_values = enriched_df[col].head(3).tolist()
                 logger.info(f"Sample values for '{col}': {sample_values}")
             else:
                 logger.error(f"Column '{col}' not found in enriched DataFrame!")
         
-        # Create enriched Excel file
-        temp_filename = ExcelService.create_enriched_excel(
-            content, enriched_df, sheet_name, header_row, SAMPLE_RULES
+        # Create enriched Excel file in memory
+        output = await asyncio.to_thread(
+            ExcelService.create_enriched_excel,
+            upload_filename, enriched_df, sheet_name, header_row, SAMPLE_RULES
         )
         
         # Generate a unique filename for download
         output_filename = f"modified_{file.filename}"
         
         # Return the file
-        return FileResponse(
-            path=temp_filename,
-            filename=output_filename,
-            media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        return StreamingResponse(
+            _iter_buffer(output),
+            media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            headers={
+                "Content-Disposition": _content_disposition(output_filename),
+                "Content-Length": str(output.getbuffer().nbytes)
+            }
         )
         
     except HTTPException as he:
         # Re-raise HTTP exceptions (400, etc.)
         logger.error(f"HTTP Exception in export: {he.detail}")
-        if temp_filename and os.path.exists(temp_filename):
-            os.unlink(temp_filename)
         raise he
     except Exception as e:
         # Log the full error details
@@ -108,15 +161,15 @@ async def export_modified_excel(
         logger.error(f"Unexpected error in export endpoint: {str(e)}")
         logger.error(f"Full traceback: {error_details}")
         
-        # Clean up temp file if it exists
-        if temp_filename and os.path.exists(temp_filename):
-            try:
-                os.unlink(temp_filename)
-            except Exception as cleanup_error:
-                logger.error(f"Error cleaning up temp file: {cleanup_error}")
-        
         # Return detailed error information
         raise HTTPException(
             status_code=500, 
             detail=f"Error processing file: {str(e)}. Check server logs for details."
         )
+    finally:
+        # The uploaded copy is only needed while processing the request
+        if upload_filename and os.path.exists(upload_filename):
+            try:
+                os.unlink(upload_filename)
+            except Exception as cleanup_error:
+                logger.error(f"Error cleaning up uploaded file: {cleanup_error}")
@@ -3,9 +3,10 @@ Health check and status routes
 """
 
 from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
 from ..models.schemas import APIResponse, OpenAIStatusResponse
 from ..services.openai_service import OpenAIService
-from ..core.config import SAMPLE_RULES
+from ..core.config import SAMPLE_RULES, unfreeze_rules
 
 router = APIRouter()
 
@@ -24,7 +25,7 @@ async def get_sample_data():
     """
     Returns the JSON rules for enrichment
     """
-    return SAMPLE_RULES
+    return ORJSONResponse(unfreeze_rules(SAMPLE_RULES))
 
 
 @router.get("/openai-status", response_model=OpenAIStatusResponse)
@@ -2,10 +2,12 @@
 Services package for the Excel AI Modifier application
 """
 
+from .rate_limiter import RateLimiter
 from .openai_service import OpenAIService
 from .excel_service import ExcelService
 
 __all__ = [
+    "RateLimiter",
     "OpenAIService",
     "ExcelService"
 ]
@@ -2,26 +2,36 @@
 Excel processing service for data enrichment and file manipulation
 """
 
-import pandas as pd
+import asyncio
 import io
-import tempfile
-import os
+import pandas as pd
+from copy import copy
 import logging
-from typing import Dict, Any
-from openpyxl import load_workbook
+from itertools import compress
+from operator import itemgetter
+from typing import BinaryIO, Dict, Any, List, Mapping, Sequence, Tuple
+from openpyxl import Workbook, load_workbook
 from openpyxl.utils import get_column_letter
 
-from ..core.config import SAMPLE_RULES
-from ..models.schemas import VehicleInfo, EnrichmentResult
-from ..utils.excel_utils import find_column_mapping, extract_vehicle_info
+from ..core.config import (
+    settings, SAMPLE_RULES, AVAILABLE_TYPES, NEW_COLUMNS, COVERAGE_KEYS_BY_TYPE, derive_rule_indexes
+)
+from ..models.schemas import InsuranceValues, VehicleInfo, EnrichmentResult
+from ..utils.excel_utils import YEAR_PATTERN, find_column_mapping, build_column_map
 from ..utils.formatting_utils import (
     copy_cell_style, apply_cell_style, auto_adjust_column_widths,
-    get_data_row_styles, clear_data_rows, find_original_table_end
+    get_data_row_style_arrays, clear_data_rows, find_original_table_end
 )
-from .openai_service import OpenAIService
+from .openai_service import OpenAIService, TRACTO_PATTERN, REMOLQUE_PATTERN
 
 logger = logging.getLogger(__name__)
 
+# Enrichment columns (LIMITES, DEDUCIBLES) filled for each generated coverage
+COVERAGE_COLUMNS = {
+    "DANOS MATERIALES": ("DANOS MATERIALES LIMITES", "DANOS MATERIALES DEDUCIBLES"),
+    "ROBO TOTAL": ("ROBO TOTAL LIMITES", "ROBO TOTAL DEDUCIBLES")
+}
+
 
 class ExcelService:
     """Service for Excel processing operations"""
@@ -29,195 +39,465 @@ class ExcelService:
     @staticmethod
     def apply_ai_enrichment(df: pd.DataFrame, rules: Dict[str, Any] = None) -> pd.DataFrame:
         """
-        Apply AI-based enrichment rules to the DataFrame using OpenAI for intelligent classification
+        Apply AI-based enrichment rules to the DataFrame using OpenAI for intelligent classification.
+        The new columns are added to the given DataFrame, which is returned.
         """
         if rules is None:
             rules = SAMPLE_RULES
-            
-        # Create a copy to avoid modifying the original
-        enriched_df = df.copy()
         
+        available_types, _, _ = ExcelService._rule_indexes(rules)
+        enriched_df, vehicle_rows, classifications, ambiguous_descriptions = (
+            ExcelService._prepare_classifications(df, rules, available_types)
+        )
+        
+        # Classify the remaining unique descriptions with batched OpenAI requests
+        classifications.update(zip(
+            ambiguous_descriptions,
+            OpenAIService.classify_vehicles_batch(ambiguous_descriptions, available_types)
+        ))
+        
+        # Generate insurance values with batched OpenAI requests per coverage
+        coverage_plans = ExcelService._plan_coverage_requests(vehicle_rows, classifications, rules)
+        values_by_coverage = {
+            coverage: OpenAIService.generate_insurance_values_batch(
+                ExcelService._build_vehicle_infos(unique_keys), coverage
+            )
+            for coverage, (_, unique_keys) in coverage_plans.items()
+        }
+        
+        return ExcelService._assign_enrichment(enriched_df, rules, coverage_plans, values_by_coverage)
+    
+    @staticmethod
+    async def apply_ai_enrichment_async(df: pd.DataFrame, rules: Dict[str, Any] = None) -> pd.DataFrame:
+        """
+        Async variant of apply_ai_enrichment that overlaps the OpenAI requests,
+        keeping at most MAX_WORKERS of them in flight
+        """
+        if rules is None:
+            rules = SAMPLE_RULES
+        
+        available_types, _, _ = ExcelService._rule_indexes(rules)
+        enriched_df, vehicle_rows, classifications, ambiguous_descriptions = (
+            ExcelService._prepare_classifications(df, rules, available_types)
+        )
+        semaphore = asyncio.Semaphore(settings.MAX_WORKERS)
+        
+        # Classify the remaining unique descriptions with concurrent batched OpenAI requests
+        classifications.update(zip(
+            ambiguous_descriptions,
+            await OpenAIService.classify_vehicles_batch_async(ambiguous_descriptions, available_types, semaphore)
+        ))
+        
+        # Generate insurance values for all coverages concurrently
+        coverage_plans = ExcelService._plan_coverage_requests(vehicle_rows, classifications, rules)
+        coverage_values = await asyncio.gather(*[
+            OpenAIService.generate_insurance_values_batch_async(
+                ExcelService._build_vehicle_infos(unique_keys), coverage, semaphore
+            )
+            for coverage, (_, unique_keys) in coverage_plans.items()
+        ])
+        values_by_coverage = dict(zip(coverage_plans.keys(), coverage_values))
+        
+        return ExcelService._assign_enrichment(enriched_df, rules, coverage_plans, values_by_coverage)
+    
+    @staticmethod
+    def get_required_columns(columns: Sequence[Any], rules: Mapping[str, Any] = None) -> List[Any]:
+        """
+        Select the sheet columns the enrichment reads: the reference column
+        and the vehicle year and model columns
+        """
+        if rules is None:
+            rules = SAMPLE_RULES
+        
+        target_reference_column = rules["reglas_asignacion"]["mapeo_columnas"]["columna_referencia"]
+        try:
+            reference_column = find_column_mapping(columns, target_reference_column)
+        except ValueError:
+            # Keep every column so the enrichment step reports the missing reference column
+            return list(columns)
+        
+        year_col, model_col = build_column_map(columns)
+        return list(dict.fromkeys(col for col in (reference_column, year_col, model_col) if col is not None))
+    
+    @staticmethod
+    def _rule_indexes(rules: Mapping[str, Any]) -> Tuple[Tuple[str, ...], Tuple[str, ...], Dict[str, Tuple[str, ...]]]:
+        """
+        Return (available types, new columns, coverage names per type) for the rules,
+        reusing the indexes precomputed at import time for the sample rules
+        """
+        if rules is SAMPLE_RULES:
+            return AVAILABLE_TYPES, NEW_COLUMNS, COVERAGE_KEYS_BY_TYPE
+        return derive_rule_indexes(rules)
+    
+    @staticmethod
+    def _prepare_classifications(
+        df: pd.DataFrame, rules: Dict[str, Any], available_types: Sequence[str]
+    ) -> Tuple[pd.DataFrame, Dict[int, Tuple[str, str, str]], Dict[str, str], List[str]]:
+        """
+        Collect the rows to enrich and classify their unique descriptions by keyword.
+        Returns the rows, the keyword classifications and the ambiguous descriptions
+        left for OpenAI, so callers only differ in how they send those requests.
+        """
+        enriched_df, vehicle_rows = ExcelService._prepare_enrichment(df, rules)
+        
+        unique_descriptions = list(dict.fromkeys(description for description, _, _ in vehicle_rows.values()))
+        classifications = ExcelService._preclassify_descriptions(unique_descriptions, available_types)
+        ambiguous_descriptions = [description for description in unique_descriptions if description not in classifications]
+        logger.info(f"Classifying {len(unique_descriptions)} unique vehicle descriptions for {len(vehicle_rows)} rows ({len(ambiguous_descriptions)} with OpenAI)")
+        
+        return enriched_df, vehicle_rows, classifications, ambiguous_descriptions
+    
+    @staticmethod
+    def _prepare_enrichment(df: pd.DataFrame, rules: Dict[str, Any]) -> Tuple[pd.DataFrame, Dict[int, Tuple[str, str, str]]]:
+        """
+        Collect (description, year, model) for every row with a vehicle description,
+        keyed by row position. The DataFrame is enriched in place, without a copy.
+        """
         # Get the reference column for mapping with fuzzy matching
         target_reference_column = rules["reglas_asignacion"]["mapeo_columnas"]["columna_referencia"]
         
         try:
             # Find the actual column name using fuzzy matching
-            reference_column = find_column_mapping(enriched_df, target_reference_column)
+            reference_column = find_column_mapping(df, target_reference_column)
             logger.info(f"Using column '{reference_column}' for vehicle type classification")
         except ValueError as e:
             logger.error(f"Column mapping error: {str(e)}")
-            raise ValueError(f"Reference column '{target_reference_column}' not found in data. Available columns: {list(enriched_df.columns)}")
+            raise ValueError(f"Reference column '{target_reference_column}' not found in data. Available columns: {list(df.columns)}")
         
-        # Add new columns for enrichment
-        new_columns = rules["reglas_asignacion"]["columnas_a_agregar"]
-        for col in new_columns:
-            enriched_df[col] = ""
+        # Filter out empty descriptions for the whole column at once
+        descriptions = df[reference_column].astype("string[pyarrow]").fillna("").str.strip()
+        valid_mask = ~descriptions.str.lower().isin(['nan', 'none', '']).to_numpy(dtype=bool)
+        skipped_count = len(df) - int(valid_mask.sum())
+        if skipped_count:
+            logger.warning(f"Empty vehicle description in {skipped_count} rows, skipping")
         
-        # Get available vehicle types from rules
-        available_types = list(rules["coberturas_por_tipo"].keys())
+        # Collect the rows to enrich along with their vehicle details
+        extras = ExcelService._precompute_vehicle_extras(df, descriptions)[valid_mask]
+        vehicle_rows = {
+            position: (vehicle_description, year, model)
+            for position, vehicle_description, year, model in zip(
+                valid_mask.nonzero()[0].tolist(),
+                descriptions[valid_mask].tolist(),
+                extras["year"].tolist(),
+                extras["model"].tolist()
+            )
+        }
         
-        # Apply enrichment rules based on AI-powered vehicle classification
-        for index, row in enriched_df.iterrows():
-            vehicle_description = str(row[reference_column]).strip()
-            
-            if not vehicle_description or vehicle_description.lower() in ['nan', 'none', '']:
-                logger.warning(f"Empty vehicle description at row {index}, skipping")
-                continue
-            
-            try:
-                # Use OpenAI to classify the vehicle type
-                coverage_type = OpenAIService.classify_vehicle(vehicle_description, available_types)
-                logger.info(f"Row {index}: '{vehicle_description}' classified as '{coverage_type}'")
-                
-                # Extract additional vehicle information
-                vehicle_extra_info = extract_vehicle_info(row, enriched_df)
-                
-                # Create vehicle info object
-                vehicle_info = VehicleInfo(
-                    description=vehicle_description,
-                    type=coverage_type,
-                    year=vehicle_extra_info["year"],
-                    model=vehicle_extra_info["model"]
+        return df, vehicle_rows
+    
+    @staticmethod
+    def _precompute_vehicle_extras(df: pd.DataFrame, descriptions: pd.Series) -> pd.DataFrame:
+        """
+        Compute the year and model of every row with column-wide string operations,
+        from the columns resolved by build_column_map. Rows without a year column
+        value take the year from their description.
+        """
+        year_col, model_col = build_column_map(df)
+        
+        def column_text(col) -> pd.Series:
+            if col is None:
+                return pd.Series("", index=df.index, dtype="string[pyarrow]")
+            return df[col].astype("string[pyarrow]").str.strip().fillna("")
+        
+        year = column_text(year_col)
+        description_years = descriptions.str.extract(YEAR_PATTERN, expand=False)
+        year = year.where(year != "", description_years).fillna("")
+        return pd.DataFrame({"year": year, "model": column_text(model_col)})
+    
+    @staticmethod
+    def _preclassify_descriptions(descriptions: List[str], available_types: Sequence[str]) -> Dict[str, str]:
+        """
+        Classify the descriptions whose keywords leave no doubt about the vehicle type,
+        using column-wide string matching. Other descriptions are left for OpenAI.
+        """
+        upper_descriptions = pd.Series(descriptions, dtype="string[pyarrow]").str.upper()
+        is_tracto = upper_descriptions.str.contains(TRACTO_PATTERN).to_numpy(dtype=bool)
+        is_remolque = upper_descriptions.str.contains(REMOLQUE_PATTERN).to_numpy(dtype=bool) & ~is_tracto
+        
+        classifications = {}
+        for vehicle_type, mask in (("TRACTOS", is_tracto), ("REMOLQUES", is_remolque)):
+            if vehicle_type in available_types:
+                classifications.update((description, vehicle_type) for description in compress(descriptions, mask))
+        return classifications
+    
+    @staticmethod
+    def _plan_coverage_requests(
+        vehicle_rows: Dict[int, Tuple[str, str, str]],
+        classifications: Dict[str, str],
+        rules: Dict[str, Any]
+    ) -> Dict[str, Tuple[Dict[int, Tuple[str, str, str, str]], List[Tuple[str, str, str, str]]]]:
+        """
+        For each coverage, key the covered rows by their vehicle details so identical
+        vehicles share one result. Returns {coverage: (row keys by position, unique keys)},
+        where the unique keys are the vehicles that still need values from OpenAI, ordered
+        by vehicle type and year so batched requests share as much prompt prefix as possible
+        """
+        _, _, coverage_keys_by_type = ExcelService._rule_indexes(rules)
+        
+        for coverage_type in set(classifications.values()):
+            if coverage_type not in coverage_keys_by_type:
+                logger.warning(f"Coverage type '{coverage_type}' not found in rules")
+        
+        coverage_plans = {}
+        for coverage in COVERAGE_COLUMNS:
+            covered_types = {
+                vehicle_type for vehicle_type, coverage_keys in coverage_keys_by_type.items()
+                if coverage in coverage_keys
+            }
+            row_keys = {
+                position: (description, classifications[description], year, model)
+                for position, (description, year, model) in vehicle_rows.items()
+                if classifications[description] in covered_types
+            }
+            if row_keys:
+                # Vehicles whose rule fixes the values need no OpenAI request
+                literal_values = ExcelService._literal_rule_values(rules, coverage)
+                unique_keys = sorted(
+                    (
+                        row_key for row_key in dict.fromkeys(row_keys.values())
+                        if row_key[1] not in literal_values
+                    ),
+                    key=itemgetter(1, 2)
                 )
-                
-                # Get coverage rules for this vehicle type
-                if coverage_type in rules["coberturas_por_tipo"]:
-                    coverages = rules["coberturas_por_tipo"][coverage_type]["coberturas"]
-                    
-                    # Generate specific values for DANOS MATERIALES
-                    if "DANOS MATERIALES" in coverages:
-                        danos_values = OpenAIService.generate_insurance_values(
-                            vehicle_info, "DANOS MATERIALES"
-                        )
-                        enriched_df.at[index, "DANOS MATERIALES LIMITES"] = danos_values.LIMITES
-                        enriched_df.at[index, "DANOS MATERIALES DEDUCIBLES"] = danos_values.DEDUCIBLES
-                        logger.info(f"Row {index} DANOS MATERIALES: Limites={danos_values.LIMITES}, Deducibles={danos_values.DEDUCIBLES}")
-                    
-                    # Generate specific values for ROBO TOTAL
-                    if "ROBO TOTAL" in coverages:
-                        robo_values = OpenAIService.generate_insurance_values(
-                            vehicle_info, "ROBO TOTAL"
-                        )
-                        enriched_df.at[index, "ROBO TOTAL LIMITES"] = robo_values.LIMITES
-                        enriched_df.at[index, "ROBO TOTAL DEDUCIBLES"] = robo_values.DEDUCIBLES
-                        logger.info(f"Row {index} ROBO TOTAL: Limites={robo_values.LIMITES}, Deducibles={robo_values.DEDUCIBLES}")
-                else:
-                    logger.warning(f"Coverage type '{coverage_type}' not found in rules")
-                    
-            except Exception as e:
-                logger.error(f"Error processing row {index}: {str(e)}")
-                # Continue with next row instead of failing completely
-                continue
+                coverage_plans[coverage] = (row_keys, unique_keys)
+        return coverage_plans
+    
+    @staticmethod
+    def _literal_rule_values(rules: Mapping[str, Any], coverage: str) -> Dict[str, InsuranceValues]:
+        """
+        Collect the insurance values the rules fix for a coverage, by vehicle type.
+        Only rules whose LIMITES and DEDUCIBLES are both literals qualify;
+        amounts in "$" are left to OpenAI.
+        """
+        literal_values = {}
+        for vehicle_type, type_rules in rules["coberturas_por_tipo"].items():
+            coverage_rules = type_rules["coberturas"].get(coverage, {})
+            limites = coverage_rules.get("LIMITES")
+            deducibles = coverage_rules.get("DEDUCIBLES")
+            if all(isinstance(value, str) and value and "$" not in value for value in (limites, deducibles)):
+                literal_values[vehicle_type] = InsuranceValues(LIMITES=limites, DEDUCIBLES=deducibles)
+        return literal_values
+    
+    @staticmethod
+    def _build_vehicle_infos(unique_keys: List[Tuple[str, str, str, str]]) -> List[VehicleInfo]:
+        """Build the vehicle info objects sent to OpenAI for each unique vehicle"""
+        return [VehicleInfo._make(key) for key in unique_keys]
+    
+    @staticmethod
+    def _assign_enrichment(
+        enriched_df: pd.DataFrame,
+        rules: Dict[str, Any],
+        coverage_plans: Dict[str, Tuple[Dict[int, Tuple[str, str, str, str]], List[Tuple[str, str, str, str]]]],
+        values_by_coverage: Dict[str, List[InsuranceValues]]
+    ) -> pd.DataFrame:
+        """
+        Fill the new enrichment columns by row position and assign each one in bulk
+        """
+        _, new_columns, _ = ExcelService._rule_indexes(rules)
+        row_count = len(enriched_df)
+        new_values = {col: [""] * row_count for col in new_columns}
+        
+        for coverage, (row_keys, unique_keys) in coverage_plans.items():
+            literal_values = ExcelService._literal_rule_values(rules, coverage)
+            values_by_key = dict(zip(unique_keys, values_by_coverage[coverage]))
+            # Resolve each distinct vehicle to its (LIMITES, DEDUCIBLES) pair once,
+            # so the row loop is a single lookup
+            pairs_by_key = {}
+            for row_key in dict.fromkeys(row_keys.values()):
+                insurance_values = literal_values.get(row_key[1]) or values_by_key[row_key]
+                pairs_by_key[row_key] = (insurance_values.LIMITES, insurance_values.DEDUCIBLES)
+            
+            limites_column, deducibles_column = COVERAGE_COLUMNS[coverage]
+            limites = new_values.setdefault(limites_column, [""] * row_count)
+            deducibles = new_values.setdefault(deducibles_column, [""] * row_count)
+            for position, row_key in row_keys.items():
+                limites[position], deducibles[position] = pairs_by_key[row_key]
+            logger.info(f"Assigned {coverage} values to {len(row_keys)} rows ({len(unique_keys)} unique vehicles valued with OpenAI)")
+        
+        # Assign each new column in one operation, as Arrow-backed strings
+        for col, values in new_values.items():
+            enriched_df[col] = pd.array(values, dtype="string[pyarrow]")
         
         return enriched_df
     
     @staticmethod
     def create_enriched_excel(
-        original_content: bytes, 
+        source_path: str, 
         enriched_df: pd.DataFrame, 
         sheet_name: str, 
         header_row: int,
         rules: Dict[str, Any] = None
-    ) -> str:
+    ) -> io.BytesIO:
         """
-        Create an enriched Excel file with proper formatting
+        Create an enriched Excel file with proper formatting, returned as an in-memory buffer
         """
         if rules is None:
             rules = SAMPLE_RULES
             
-        # Create a temporary file for the modified Excel
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx')
-        temp_filename = temp_file.name
-        temp_file.close()
+        _, new_columns, _ = ExcelService._rule_indexes(rules)
         
-        try:
-            # Load the original workbook to preserve all formatting
-            wb = load_workbook(io.BytesIO(original_content))
+        # Build the modified Excel in memory
+        output = io.BytesIO()
+        
+        # Large sheets skip the full-fidelity load and are streamed value by value
+        if len(enriched_df) > settings.MAX_STYLED_ROWS:
+            logger.info(f"Sheet has {len(enriched_df)} rows, writing values without per-cell formatting")
+            ExcelService._write_values_only(
+                source_path, enriched_df, sheet_name, header_row,
+                new_columns, output
+            )
+            output.seek(0)
+            return output
+        
+        # Load the original workbook to preserve all formatting
+        wb = load_workbook(source_path)
+        
+        if sheet_name in wb.sheetnames:
+            ws = wb[sheet_name]
             
-            if sheet_name in wb.sheetnames:
-                ws = wb[sheet_name]
-                
-                # Find where data starts (after header row)
-                data_start_row = header_row + 2  # +1 for 0-based to 1-based, +1 for row after header
-                header_row_excel = header_row + 1  # Convert to 1-based for Excel
-                
-                # Find the actual end of the original table data
-                original_table_end_col = find_original_table_end(ws, header_row_excel)
-                
-                # Map existing columns
-                col_mapping = {}
-                for col_idx in range(1, original_table_end_col + 1):
-                    header_cell = ws.cell(row=header_row_excel, column=col_idx)
-                    if header_cell.value:
-                        col_name = str(header_cell.value).strip()
-                        col_mapping[col_name] = col_idx
-                
-                # Add new columns right after the original table
-                new_columns = rules["reglas_asignacion"]["columnas_a_agregar"]
-                next_col = original_table_end_col + 1
-                
-                # Get header style from the last original column to copy formatting
-                last_original_header = ws.cell(row=header_row_excel, column=original_table_end_col)
-                header_style = copy_cell_style(last_original_header)
-                
-                for new_col in new_columns:
-                    if new_col not in col_mapping:
-                        # Add the new column header with same formatting as original headers
-                        new_header_cell = ws.cell(row=header_row_excel, column=next_col, value=new_col)
-                        apply_cell_style(new_header_cell, header_style)
-                        
-                        col_mapping[new_col] = next_col
-                        logger.info(f"Added new column '{new_col}' at position {next_col} ({get_column_letter(next_col)})")
-                        next_col += 1
-                
-                # Get data row styles for copying formatting
-                data_row_styles = get_data_row_styles(ws, data_start_row, original_table_end_col)
-                
-                # Clear only the data rows, not headers
-                max_row = ws.max_row
-                clear_data_rows(ws, data_start_row, max_row, next_col)
-                
-                # Write the enriched data while preserving formatting
-                for row_idx, (df_idx, df_row) in enumerate(enriched_df.iterrows()):
-                    excel_row = data_start_row + row_idx
+            # Find where data starts (after header row)
+            data_start_row = header_row + 2  # +1 for 0-based to 1-based, +1 for row after header
+            header_row_excel = header_row + 1  # Convert to 1-based for Excel
+            
+            # Find the actual end of the original table data
+            original_table_end_col = find_original_table_end(ws, header_row_excel)
+            
+            # Map existing columns
+            col_mapping = {}
+            for col_idx in range(1, original_table_end_col + 1):
+                header_cell = ws.cell(row=header_row_excel, column=col_idx)
+                if header_cell.value:
+                    col_name = str(header_cell.value).strip()
+                    col_mapping[col_name] = col_idx
+            
+            # Add new columns right after the original table
+            next_col = original_table_end_col + 1
+            
+            # Get header style from the last original column to copy formatting
+            last_original_header = ws.cell(row=header_row_excel, column=original_table_end_col)
+            header_style = copy_cell_style(last_original_header)
+            
+            for new_col in new_columns:
+                if new_col not in col_mapping:
+                    # Add the new column header with same formatting as original headers
+                    new_header_cell = ws.cell(row=header_row_excel, column=next_col, value=new_col)
+                    apply_cell_style(new_header_cell, header_style)
                     
-                    # Write data for each column
-                    for col_name, col_pos in col_mapping.items():
-                        if col_name in enriched_df.columns:
-                            value = df_row[col_name]
-                            # Handle NaN values
-                            if pd.isna(value):
-                                value = ""
-                            
-                            cell = ws.cell(row=excel_row, column=col_pos, value=value)
-                            
-                            # Apply formatting based on whether it's an original or new column
-                            if col_pos <= original_table_end_col and col_pos in data_row_styles:
-                                # Use original formatting for existing columns
-                                apply_cell_style(cell, data_row_styles[col_pos])
-                            elif col_pos > original_table_end_col:
-                                # Use similar formatting for new columns (based on last original column)
-                                if original_table_end_col in data_row_styles:
-                                    apply_cell_style(cell, data_row_styles[original_table_end_col])
+                    col_mapping[new_col] = next_col
+                    logger.info(f"Added new column '{new_col}' at position {next_col} ({get_column_letter(next_col)})")
+                    next_col += 1
+            
+            # Get the data row style arrays for copying formatting; each written cell takes a
+            # copy of its column's array, so the workbook's style table is left as it is
+            data_row_style_arrays = get_data_row_style_arrays(ws, data_start_row, original_table_end_col)
+            new_column_style = data_row_style_arrays.get(original_table_end_col)
+            
+            # Clear the data rows of the appended columns, not headers or original data
+            max_row = ws.max_row
+            clear_data_rows(ws, data_start_row, max_row, next_col, min_col=original_table_end_col + 1)
+            
+            # Write the enrichment columns; DataFrame rows line up with the sheet rows,
+            # so the original cells are left untouched
+            for col_name in new_columns:
+                if col_name not in enriched_df.columns:
+                    continue
                 
-                # Auto-adjust column widths for new columns
-                auto_adjust_column_widths(ws, original_table_end_col + 1, next_col)
+                col_pos = col_mapping[col_name]
+                if col_pos <= original_table_end_col:
+                    # Use original formatting for existing columns
+                    style = data_row_style_arrays.get(col_pos)
+                else:
+                    # Use similar formatting for new columns (based on last original column)
+                    style = new_column_style
                 
-                logger.info(f"Updated sheet '{sheet_name}' with {len(enriched_df)} rows and {len(col_mapping)} columns")
-                logger.info(f"Original table ended at column {original_table_end_col}, new columns start at {original_table_end_col + 1}")
-                logger.info(f"Column mapping: {col_mapping}")
+                for row_idx, value in enumerate(enriched_df[col_name].tolist()):
+                    # Handle NaN values
+                    if pd.isna(value):
+                        value = ""
+                    
+                    cell = ws.cell(row=data_start_row + row_idx, column=col_pos, value=value)
+                    if style is not None:
+                        cell._style = copy(style)
             
-            # Save the modified workbook
-            wb.save(temp_filename)
-            wb.close()
+            # Auto-adjust column widths for new columns
+            auto_adjust_column_widths(ws, original_table_end_col + 1, next_col)
             
-            return temp_filename
+            logger.info(f"Updated sheet '{sheet_name}' with {len(enriched_df)} rows and {len(col_mapping)} columns")
+            logger.info(f"Original table ended at column {original_table_end_col}, new columns start at {original_table_end_col + 1}")
+            logger.info(f"Column mapping: {col_mapping}")
+        
+        # Save the modified workbook
+        wb.save(output)
+        wb.close()
+        
+        output.seek(0)
+        return output
+    
+    @staticmethod
+    def _write_values_only(
+        source_path: str,
+        enriched_df: pd.DataFrame,
+        sheet_name: str,
+        header_row: int,
+        new_columns: Sequence[str],
+        output: BinaryIO
+    ) -> None:
+        """
+        Stream cell values into a write-only workbook without copying styles
+        """
+        source_wb = load_workbook(source_path, read_only=True)
+        output_wb = Workbook(write_only=True)
+        
+        try:
+            header_row_excel = header_row + 1
+            data_start_row = header_row + 2
+            new_column_values = {
+                col: enriched_df[col].tolist() for col in new_columns if col in enriched_df.columns
+            }
+            
+            for source_ws in source_wb.worksheets:
+                output_ws = output_wb.create_sheet(title=source_ws.title)
+                new_column_positions = {}
+                appended_positions = []
+                
+                for row_number, row in enumerate(source_ws.iter_rows(values_only=True), start=1):
+                    values = list(row)
+                    
+                    if source_ws.title == sheet_name and row_number == header_row_excel:
+                        # Reuse existing enrichment columns, append the rest after the original table
+                        next_col = max(
+                            (position for position, value in enumerate(values, start=1)
+                             if value is not None and str(value).strip()),
+                            default=1
+                        ) + 1
+                        for col in new_column_values:
+                            if col in values:
+                                new_column_positions[col] = values.index(col)
+                            else:
+                                new_column_positions[col] = next_col - 1
+                                appended_positions.append(next_col - 1)
+                                next_col += 1
+                        values.extend([None] * (next_col - 1 - len(values)))
+                        for col, position in new_column_positions.items():
+                            values[position] = col
+                    
+                    elif new_column_positions and 0 <= row_number - data_start_row < len(enriched_df):
+                        df_position = row_number - data_start_row
+                        values.extend([None] * (max(new_column_positions.values()) + 1 - len(values)))
+                        for col, position in new_column_positions.items():
+                            value = new_column_values[col][df_position]
+                            values[position] = "" if pd.isna(value) else value
+                    
+                    elif appended_positions and row_number > data_start_row:
+                        # Rows past the enriched data: blank the appended columns, as the styled
+                        # path clears them, so nothing stale sits under the new headers
+                        for position in appended_positions:
+                            if position < len(values):
+                                values[position] = None
+                    
+                    output_ws.append(values)
             
-        except Exception as e:
-            # Clean up temp file if there's an error
-            if os.path.exists(temp_filename):
-                try:
-                    os.unlink(temp_filename)
-                except Exception as cleanup_error:
-                    logger.error(f"Error cleaning up temp file: {cleanup_error}")
-            raise e
+            output_wb.save(output)
+            logger.info(f"Wrote values for sheet '{sheet_name}' with {len(enriched_df)} rows in write-only mode")
+        finally:
+            source_wb.close()
@@ -2,23 +2,133 @@
 OpenAI service for AI-powered vehicle classification and insurance value generation
 """
 
-import json
+import io
 import logging
+import re
 import asyncio
+import threading
 from concurrent.futures import ThreadPoolExecutor
-from typing import Dict, List
-from openai import OpenAI
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+import httpx
+import orjson
+from openai import AsyncOpenAI, OpenAI
 
 from ..core.config import settings
 from ..models.schemas import InsuranceValues, VehicleInfo
+from .rate_limiter import RateLimiter
 
 logger = logging.getLogger(__name__)
 
-# Initialize OpenAI client
-client = OpenAI(api_key=settings.OPENAI_API_KEY) if settings.OPENAI_API_KEY else None
+# Long-lived connection pools, so requests reuse kept-alive TLS connections
+http_limits = httpx.Limits(
+    max_connections=settings.OPENAI_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY
+)
+http_timeout = httpx.Timeout(settings.OPENAI_TIMEOUT, connect=settings.OPENAI_CONNECT_TIMEOUT)
 
-# Thread pool for async OpenAI calls
-executor = ThreadPoolExecutor(max_workers=settings.MAX_WORKERS)
+# Initialize OpenAI clients
+client = OpenAI(
+    api_key=settings.OPENAI_API_KEY,
+    http_client=httpx.Client(limits=http_limits, timeout=http_timeout)
+) if settings.OPENAI_API_KEY else None
+# Async calls go through the rate limiter, whose shared backoff is their only retry
+# policy; SDK retries would delay the pause and multiply the attempts per call
+async_client = AsyncOpenAI(
+    api_key=settings.OPENAI_API_KEY,
+    http_client=httpx.AsyncClient(limits=http_limits, timeout=http_timeout),
+    max_retries=0
+) if settings.OPENAI_API_KEY else None
+
+# Shared request/token budget for async OpenAI calls
+rate_limiter = RateLimiter(settings.OPENAI_MAX_REQUESTS_PER_MINUTE, settings.OPENAI_MAX_TOKENS_PER_MINUTE)
+
+# Process-local memo of OpenAI results, so repeated vehicles skip the network. Worker threads
+# write to it concurrently, so writes hold the lock and reads use a single dict.get
+_classification_cache: Dict[Tuple[str, Tuple[str, ...]], str] = {}
+_insurance_values_cache: Dict[Tuple[str, str, str, str, str], InsuranceValues] = {}
+_cache_lock = threading.Lock()
+
+
+def _remember(cache: Dict[Any, Any], key: Any, value: Any) -> None:
+    """Store a memoized result, evicting the oldest entry once the cache is full"""
+    with _cache_lock:
+        if key not in cache and len(cache) >= settings.OPENAI_CACHE_SIZE:
+            del cache[next(iter(cache))]
+        cache[key] = value
+
+
+# Description keywords that identify the vehicle type; TRACTO takes priority over the trailer keywords
+TRACTO_PATTERN = "TRACTO"
+REMOLQUE_PATTERN = "TANQUE|REMOLQUE|DOLLY|SEMI"
+_TRACTO_RE = re.compile(TRACTO_PATTERN)
+_REMOLQUE_RE = re.compile(REMOLQUE_PATTERN)
+
+
+# Underwriting guidelines shared by the single and batched insurance prompts
+INSURANCE_GUIDELINES = """- Vehicle type, age, and value
+            - Market conditions in Latin America
+            - Commercial vehicle insurance standards
+            - Currency should be in USD for limits
+            
+            For DANOS MATERIALES (Physical Damage):
+            - TRACTOS: Limits typically $80,000-$150,000 USD, Deductibles 8-12%
+            - REMOLQUES: Limits typically $40,000-$80,000 USD, Deductibles 5-8%
+            - Newer vehicles (2020+): Higher limits, lower deductibles
+            - Older vehicles (pre-2015): Lower limits, higher deductibles
+            - Premium brands (Freightliner, Volvo, etc.): Higher values
+            
+            For ROBO TOTAL (Total Theft):
+            - TRACTOS: Limits typically $80,000-$150,000 USD, Deductibles 8-12%  
+            - REMOLQUES: Limits typically $40,000-$80,000 USD, Deductibles 5-8%
+            - Consider vehicle age and theft risk
+            - High-value vehicles: Higher limits and deductibles"""
+
+# Category descriptions shared by the single and batched classification prompts
+CLASSIFICATION_GUIDELINES = """- TRACTOS: Truck tractors, prime movers, cab units that pull trailers
+            - REMOLQUES: Trailers, semi-trailers, tankers, dollies, any towed equipment"""
+
+# Function schemas used to return insurance values as structured arguments
+INSURANCE_VALUES_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "LIMITES": {"type": "string", "description": "Limit in the format $US XXX,XXX"},
+        "DEDUCIBLES": {"type": "string", "description": "Deductible in the format X.X %"}
+    },
+    "required": ["LIMITES", "DEDUCIBLES"]
+}
+
+INSURANCE_VALUES_FUNCTION = {
+    "name": "record_vehicle_insurance_values",
+    "description": "Record the insurance values for the vehicle",
+    "parameters": INSURANCE_VALUES_SCHEMA
+}
+
+INSURANCE_BATCH_FUNCTION = {
+    "name": "record_insurance_values",
+    "description": "Record the insurance values for each vehicle, in the same order as the vehicles",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "results": {"type": "array", "items": INSURANCE_VALUES_SCHEMA}
+        },
+        "required": ["results"]
+    }
+}
+
+
+class _BatchPlan(NamedTuple):
+    """
+    A batched OpenAI operation: the result key of each input in input order, the results
+    already known, the pending inputs in batches, and how to request, parse and fall back
+    """
+    keys: List[Tuple]
+    results: Dict[Tuple, Any]
+    chunks: List[List[Any]]
+    build_request: Callable[[List[Any]], Dict[str, Any]]
+    parse: Callable[[Any, List[Any]], Dict[Tuple, Any]]
+    fallback: Callable[[List[Any]], Dict[Tuple, Any]]
+    error_message: str
 
 
 class OpenAIService:
@@ -68,13 +178,14 @@ class OpenAIService:
             logger.warning("OpenAI not configured, using fallback values")
             return OpenAIService._get_fallback_values(vehicle_info.type)
         
+        cache_key = OpenAIService._insurance_cache_key(vehicle_info, coverage_type)
+        cached = _insurance_values_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             # Build context about the vehicle
-            vehicle_context = f"Vehicle: {vehicle_info.description}"
-            if vehicle_info.year:
-                vehicle_context += f", Year: {vehicle_info.year}"
-            if vehicle_info.model:
-                vehicle_context += f", Model: {vehicle_info.model}"
+            vehicle_context = OpenAIService._build_vehicle_context(vehicle_info)
             
             prompt = f"""
             You are an expert insurance underwriter specializing in commercial vehicle insurance in Latin America.
@@ -85,23 +196,7 @@ class OpenAIService:
             Coverage: {coverage_type}
             
             Generate realistic insurance values for this vehicle. Consider:
-            - Vehicle type, age, and value
-            - Market conditions in Latin America
-            - Commercial vehicle insurance standards
-            - Currency should be in USD for limits
-            
-            For DANOS MATERIALES (Physical Damage):
-            - TRACTOS: Limits typically $80,000-$150,000 USD, Deductibles 8-12%
-            - REMOLQUES: Limits typically $40,000-$80,000 USD, Deductibles 5-8%
-            - Newer vehicles (2020+): Higher limits, lower deductibles
-            - Older vehicles (pre-2015): Lower limits, higher deductibles
-            - Premium brands (Freightliner, Volvo, etc.): Higher values
-            
-            For ROBO TOTAL (Total Theft):
-            - TRACTOS: Limits typically $80,000-$150,000 USD, Deductibles 8-12%  
-            - REMOLQUES: Limits typically $40,000-$80,000 USD, Deductibles 5-8%
-            - Consider vehicle age and theft risk
-            - High-value vehicles: Higher limits and deductibles
+            {INSURANCE_GUIDELINES}
             
             Respond ONLY in this exact JSON format:
             {{
@@ -119,22 +214,20 @@ class OpenAIService:
                     {"role": "user", "content": prompt}
                 ],
                 max_tokens=settings.OPENAI_MAX_TOKENS,
-                temperature=settings.OPENAI_TEMPERATURE
+                temperature=settings.OPENAI_TEMPERATURE,
+                stream=True,
+                **OpenAIService._json_output_options(INSURANCE_VALUES_FUNCTION)
             )
             
-            # Parse the JSON response
-            response_text = response.choices[0].message.content.strip()
-            
-            # Clean up the response to ensure it's valid JSON
-            if response_text.startswith("```json"):
-                response_text = response_text.replace("```json", "").replace("```", "").strip()
-            
-            values = json.loads(response_text)
+            # Parse the JSON response as soon as it is complete
+            values = OpenAIService._read_streamed_json(response)
             
             # Validate the response has required keys
             if "LIMITES" in values and "DEDUCIBLES" in values:
-                logger.info(f"Generated insurance values: {values}")
-                return InsuranceValues(**values)
+                logger.debug("Generated insurance values: %s", values)
+                insurance_values = InsuranceValues(**values)
+                _remember(_insurance_values_cache, cache_key, insurance_values)
+                return insurance_values
             else:
                 raise ValueError("Invalid response format from OpenAI")
                 
@@ -155,8 +248,177 @@ class OpenAIService:
             logger.warning("OpenAI not configured, using fallback classification")
             return OpenAIService._fallback_classification(vehicle_description, available_types)
         
+        # Descriptions naming the vehicle type outright need no OpenAI request
+        keyword_classification = OpenAIService._keyword_classification(vehicle_description, available_types)
+        if keyword_classification is not None:
+            return keyword_classification
+        
+        cache_key = OpenAIService._classification_cache_key(vehicle_description, available_types)
+        cached = _classification_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            prompt = f"""
+            response = client.chat.completions.create(
+                **OpenAIService._classification_request(vehicle_description, available_types)
+            )
+            return OpenAIService._parse_classification(response, cache_key, available_types)
+                
+        except Exception as e:
+            logger.error(f"Error in OpenAI classification: {str(e)}")
+            return OpenAIService._fallback_classification(vehicle_description, available_types)
+    
+    @staticmethod
+    def classify_vehicles_batch(descriptions: List[str], available_types: List[str]) -> List[str]:
+        """
+        Use OpenAI to classify several vehicle descriptions with batched requests,
+        sending up to MAX_WORKERS batches in parallel. Returns one category per description, in the same order.
+        """
+        return OpenAIService._run_batches(
+            OpenAIService._classification_batch_plan(descriptions, available_types)
+        )
+    
+    @staticmethod
+    async def classify_vehicles_batch_async(
+        descriptions: List[str],
+        available_types: List[str],
+        semaphore: asyncio.Semaphore = None
+    ) -> List[str]:
+        """
+        Async variant of classify_vehicles_batch that sends the batches concurrently,
+        with at most MAX_WORKERS requests in flight
+        """
+        return await OpenAIService._run_batches_async(
+            OpenAIService._classification_batch_plan(descriptions, available_types), semaphore
+        )
+    
+    @staticmethod
+    def generate_insurance_values_batch(vehicle_infos: List[VehicleInfo], coverage_type: str) -> List[InsuranceValues]:
+        """
+        Use OpenAI to generate insurance values for several vehicles with batched requests,
+        sending up to MAX_WORKERS batches in parallel. Returns one set of values per vehicle, in the same order.
+        """
+        return OpenAIService._run_batches(
+            OpenAIService._insurance_batch_plan(vehicle_infos, coverage_type)
+        )
+    
+    @staticmethod
+    async def generate_insurance_values_batch_async(
+        vehicle_infos: List[VehicleInfo],
+        coverage_type: str,
+        semaphore: asyncio.Semaphore = None
+    ) -> List[InsuranceValues]:
+        """
+        Async variant of generate_insurance_values_batch that sends the batches concurrently,
+        with at most MAX_WORKERS requests in flight
+        """
+        return await OpenAIService._run_batches_async(
+            OpenAIService._insurance_batch_plan(vehicle_infos, coverage_type), semaphore
+        )
+    
+    @staticmethod
+    def _run_batches(plan: _BatchPlan) -> List[Any]:
+        """
+        Send the pending batches of a plan from a thread pool, where the requests overlap
+        while waiting on the network, and return one result per input, in input order
+        """
+        def send_chunk(chunk: List[Any]) -> Dict[Tuple, Any]:
+            try:
+                response = client.chat.completions.create(**plan.build_request(chunk))
+                return plan.parse(response, chunk)
+            except Exception as e:
+                return OpenAIService._fallback_batch(plan, chunk, e)
+        
+        results = dict(plan.results)
+        if plan.chunks:
+            with ThreadPoolExecutor(max_workers=settings.MAX_WORKERS) as pool:
+                for chunk_results in pool.map(send_chunk, plan.chunks):
+                    results.update(chunk_results)
+        return [results[key] for key in plan.keys]
+    
+    @staticmethod
+    async def _run_batches_async(plan: _BatchPlan, semaphore: asyncio.Semaphore = None) -> List[Any]:
+        """
+        Async variant of _run_batches that sends the pending batches concurrently,
+        with at most MAX_WORKERS requests in flight
+        """
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(settings.MAX_WORKERS)
+        
+        async def send_chunk(chunk: List[Any]) -> Dict[Tuple, Any]:
+            async with semaphore:
+                try:
+                    response = await OpenAIService._create_async(plan.build_request(chunk))
+                    return plan.parse(response, chunk)
+                except Exception as e:
+                    return OpenAIService._fallback_batch(plan, chunk, e)
+        
+        results = dict(plan.results)
+        for chunk_results in await asyncio.gather(*[send_chunk(chunk) for chunk in plan.chunks]):
+            results.update(chunk_results)
+        return [results[key] for key in plan.keys]
+    
+    @staticmethod
+    def _fallback_batch(plan: _BatchPlan, chunk: List[Any], error: Exception) -> Dict[Tuple, Any]:
+        """Log a failed batch request and answer its items with the plan's fallback"""
+        logger.error(f"{plan.error_message}: {str(error)}")
+        logger.warning(f"Falling back to rule-based results for {len(chunk)} items")
+        return plan.fallback(chunk)
+    
+    @staticmethod
+    async def classify_vehicle_async(vehicle_description: str, available_types: List[str]) -> str:
+        """
+        Async variant of classify_vehicle using the AsyncOpenAI client, so many
+        classifications can be awaited together with asyncio.gather
+        """
+        if not OpenAIService.is_configured():
+            logger.warning("OpenAI not configured, using fallback classification")
+            return OpenAIService._fallback_classification(vehicle_description, available_types)
+        
+        # Descriptions naming the vehicle type outright need no OpenAI request
+        keyword_classification = OpenAIService._keyword_classification(vehicle_description, available_types)
+        if keyword_classification is not None:
+            return keyword_classification
+        
+        cache_key = OpenAIService._classification_cache_key(vehicle_description, available_types)
+        cached = _classification_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        try:
+            response = await OpenAIService._create_async(
+                OpenAIService._classification_request(vehicle_description, available_types)
+            )
+            return OpenAIService._parse_classification(response, cache_key, available_types)
+                
+        except Exception as e:
+            logger.error(f"Error in OpenAI classification: {str(e)}")
+            return OpenAIService._fallback_classification(vehicle_description, available_types)
+    
+    @staticmethod
+    async def _create_async(request: Dict[str, Any]):
+        """Send a chat completion with the async client, throttled by the shared rate limiter"""
+        return await rate_limiter.run(
+            lambda: async_client.chat.completions.create(**request),
+            OpenAIService._estimate_tokens(request)
+        )
+    
+    @staticmethod
+    def _estimate_tokens(request: Dict[str, Any]) -> int:
+        """Estimate the tokens a request consumes: about 4 characters per prompt token plus the completion budget"""
+        prompt_characters = sum(len(message["content"]) for message in request["messages"])
+        return prompt_characters // 4 + request["max_tokens"]
+    
+    @staticmethod
+    def _chunks(items: List[Any]) -> List[List[Any]]:
+        """Split pending work into batches of at most OPENAI_BATCH_SIZE items"""
+        size = settings.OPENAI_BATCH_SIZE
+        return [items[start:start + size] for start in range(0, len(items), size)]
+    
+    @staticmethod
+    def _classification_request(vehicle_description: str, available_types: List[str]) -> Dict[str, Any]:
+        """Build the chat completion arguments to classify a single description"""
+        prompt = f"""
             You are an expert in vehicle classification for insurance purposes.
             
             Given the following vehicle description: "{vehicle_description}"
@@ -165,49 +427,363 @@ class OpenAIService:
             
             Based on the description, classify this vehicle into one of the available categories.
             Consider the following guidelines:
-            - TRACTOS: Truck tractors, prime movers, cab units that pull trailers
-            - REMOLQUES: Trailers, semi-trailers, tankers, dollies, any towed equipment
+            {CLASSIFICATION_GUIDELINES}
             
             Respond with ONLY the category name (exactly as provided in the list).
             If uncertain, default to TRACTOS.
             """
+        
+        return {
+            "model": settings.OPENAI_MODEL,
+            "messages": [
+                {"role": "system", "content": "You are a vehicle classification expert for insurance purposes."},
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": 50,
+            "temperature": 0.1
+        }
+    
+    @staticmethod
+    def _parse_classification(response, cache_key: Tuple, available_types: List[str]) -> str:
+        """Parse and memoize the category returned for a single description"""
+        classification = response.choices[0].message.content.strip().upper()
+        
+        # Validate the response is one of our available types
+        if classification not in available_types:
+            logger.warning(f"OpenAI returned unexpected classification '{classification}', defaulting to TRACTOS")
+            classification = "TRACTOS"
+        
+        _remember(_classification_cache, cache_key, classification)
+        return classification
+    
+    @staticmethod
+    def _classification_batch_plan(descriptions: List[str], available_types: List[str]) -> _BatchPlan:
+        """
+        Plan a batched classification: cached classifications by cache key and batches of
+        the unique descriptions still to classify. Without OpenAI, every description is
+        classified with the rule-based fallback up front.
+        """
+        keys = [OpenAIService._classification_cache_key(description, available_types) for description in descriptions]
+        classifications = {}
+        pending_by_key = {}
+        if not OpenAIService.is_configured():
+            if descriptions:
+                logger.warning("OpenAI not configured, using fallback classification")
+            classifications = OpenAIService._fallback_classifications(descriptions, available_types)
+        else:
+            for cache_key, description in zip(keys, descriptions):
+                cached = _classification_cache.get(cache_key)
+                if cached is not None:
+                    classifications[cache_key] = cached
+                else:
+                    pending_by_key.setdefault(cache_key, description)
+            if pending_by_key:
+                logger.info(f"Classifying {len(pending_by_key)} descriptions with OpenAI ({len(classifications)} cached)")
+        
+        return _BatchPlan(
+            keys=keys,
+            results=classifications,
+            chunks=OpenAIService._chunks(list(pending_by_key.values())),
+            build_request=lambda chunk: OpenAIService._classification_batch_request(chunk, available_types),
+            parse=lambda response, chunk: OpenAIService._parse_classification_batch(response, chunk, available_types),
+            fallback=lambda chunk: OpenAIService._fallback_classifications(chunk, available_types),
+            error_message="Error in batched OpenAI classification"
+        )
+    
+    @staticmethod
+    def _classification_batch_request(descriptions: List[str], available_types: List[str]) -> Dict[str, Any]:
+        """Build the chat completion arguments to classify a batch of descriptions"""
+        numbered_descriptions = "\n".join(
+            f"{position}. {description}" for position, description in enumerate(descriptions, start=1)
+        )
+        
+        prompt = f"""
+            You are an expert in vehicle classification for insurance purposes.
             
-            response = client.chat.completions.create(
-                model=settings.OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": "You are a vehicle classification expert for insurance purposes."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=50,
-                temperature=0.1
-            )
+            Classify each of the following vehicle descriptions:
+            {numbered_descriptions}
             
-            classification = response.choices[0].message.content.strip().upper()
+            Available vehicle categories are: {', '.join(available_types)}
             
-            # Validate the response is one of our available types
-            if classification in available_types:
-                return classification
-            else:
-                logger.warning(f"OpenAI returned unexpected classification '{classification}', defaulting to TRACTOS")
-                return "TRACTOS"
-                
-        except Exception as e:
-            logger.error(f"Error in OpenAI classification: {str(e)}")
-            return OpenAIService._fallback_classification(vehicle_description, available_types)
+            Consider the following guidelines:
+            {CLASSIFICATION_GUIDELINES}
+            
+            Respond ONLY with a JSON object mapping the number of each description to its
+            category name (exactly as provided in the list), e.g. {{"1": "TRACTOS", "2": "REMOLQUES"}},
+            with one entry for each of the {len(descriptions)} descriptions.
+            If uncertain about a vehicle, use TRACTOS.
+            """
+        
+        return {
+            "model": settings.OPENAI_MODEL,
+            "messages": [
+                {"role": "system", "content": "You are a vehicle classification expert for insurance purposes. Respond only with valid JSON."},
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": settings.OPENAI_BATCH_MAX_TOKENS,
+            "temperature": 0.1,
+            **OpenAIService._json_output_options()
+        }
     
     @staticmethod
-    async def classify_vehicle_async(vehicle_description: str, available_types: List[str]) -> str:
+    def _parse_classification_batch(response, descriptions: List[str], available_types: List[str]) -> Dict[Tuple, str]:
+        """
+        Parse and memoize the classifications returned for a batch of descriptions.
+        Descriptions missing from the response use the rule-based fallback.
+        """
+        parsed = OpenAIService._parse_json_response(OpenAIService._response_text(response))
+        if not isinstance(parsed, dict):
+            raise ValueError("Expected a JSON object mapping description numbers to categories from OpenAI")
+        
+        classifications = {}
+        unexpected_count = 0
+        missing = []
+        for position, description in enumerate(descriptions, start=1):
+            classification = parsed.get(str(position))
+            if classification is None:
+                missing.append(description)
+                continue
+            
+            classification = str(classification).strip().upper()
+            if classification not in available_types:
+                logger.debug("OpenAI returned unexpected classification %r for %r", classification, description)
+                unexpected_count += 1
+                classification = "TRACTOS"
+            cache_key = OpenAIService._classification_cache_key(description, available_types)
+            classifications[cache_key] = classification
+            _remember(_classification_cache, cache_key, classification)
+        
+        if unexpected_count:
+            logger.warning(f"OpenAI returned {unexpected_count} unexpected classifications, defaulting them to TRACTOS")
+        if missing:
+            logger.warning(f"OpenAI returned no classification for {len(missing)} descriptions, using fallback classification")
+            classifications.update(OpenAIService._fallback_classifications(missing, available_types))
+        return classifications
+    
+    @staticmethod
+    def _fallback_classifications(descriptions: List[str], available_types: List[str]) -> Dict[Tuple, str]:
+        """Classify a batch of descriptions with the rule-based fallback, by cache key"""
+        return {
+            OpenAIService._classification_cache_key(description, available_types):
+                OpenAIService._fallback_classification(description, available_types)
+            for description in descriptions
+        }
+    
+    @staticmethod
+    def _insurance_batch_plan(vehicle_infos: List[VehicleInfo], coverage_type: str) -> _BatchPlan:
         """
-        Async wrapper for OpenAI vehicle classification
+        Plan batched insurance values: cached values by cache key and batches of the unique
+        (cache key, vehicle) pairs still to value. Without OpenAI, every vehicle gets the
+        default fallback values up front.
         """
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            executor, 
-            OpenAIService.classify_vehicle, 
-            vehicle_description, 
-            available_types
+        keys = [OpenAIService._insurance_cache_key(vehicle_info, coverage_type) for vehicle_info in vehicle_infos]
+        values_by_key = {}
+        pending = {}
+        if not OpenAIService.is_configured():
+            if vehicle_infos:
+                logger.warning("OpenAI not configured, using fallback values")
+            values_by_key = OpenAIService._fallback_insurance_values(list(zip(keys, vehicle_infos)))
+        else:
+            for cache_key, vehicle_info in zip(keys, vehicle_infos):
+                cached = _insurance_values_cache.get(cache_key)
+                if cached is not None:
+                    values_by_key[cache_key] = cached
+                else:
+                    pending.setdefault(cache_key, vehicle_info)
+            if pending:
+                logger.info(f"Generating {coverage_type} values for {len(pending)} vehicles with OpenAI ({len(values_by_key)} cached)")
+        
+        return _BatchPlan(
+            keys=keys,
+            results=values_by_key,
+            chunks=OpenAIService._chunks(list(pending.items())),
+            build_request=lambda chunk: OpenAIService._insurance_batch_request(
+                [vehicle_info for _, vehicle_info in chunk], coverage_type
+            ),
+            parse=OpenAIService._parse_insurance_batch,
+            fallback=OpenAIService._fallback_insurance_values,
+            error_message="Error generating batched insurance values"
         )
     
+    @staticmethod
+    def _insurance_batch_request(vehicle_infos: List[VehicleInfo], coverage_type: str) -> Dict[str, Any]:
+        """Build the chat completion arguments to value a batch of vehicles"""
+        numbered_vehicles = "\n".join(
+            f"{position}. {OpenAIService._build_vehicle_context(vehicle_info)}, Vehicle Type: {vehicle_info.type}"
+            for position, vehicle_info in enumerate(vehicle_infos, start=1)
+        )
+        
+        prompt = f"""
+            You are an expert insurance underwriter specializing in commercial vehicle insurance in Latin America.
+            
+            Vehicles:
+            {numbered_vehicles}
+            Coverage: {coverage_type}
+            
+            Generate realistic insurance values for each vehicle. Consider:
+            {INSURANCE_GUIDELINES}
+            
+            Respond ONLY with a JSON object of the form {{"results": [...]}}, where "results" contains
+            exactly {len(vehicle_infos)} objects, in the same order as the vehicles, each in this exact format:
+            {{
+                "LIMITES": "$US XXX,XXX",
+                "DEDUCIBLES": "X.X %"
+            }}
+            
+            Make the values realistic and specific to each vehicle.
+            """
+        
+        return {
+            "model": settings.OPENAI_MODEL,
+            "messages": [
+                {"role": "system", "content": "You are an expert insurance underwriter. Respond only with valid JSON."},
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": settings.OPENAI_BATCH_MAX_TOKENS,
+            "temperature": settings.OPENAI_TEMPERATURE,
+            **OpenAIService._json_output_options(INSURANCE_BATCH_FUNCTION)
+        }
+    
+    @staticmethod
+    def _parse_insurance_batch(response, chunk: List[Tuple[Tuple, VehicleInfo]]) -> Dict[Tuple, InsuranceValues]:
+        """Parse and memoize the insurance values returned for a batch of vehicles"""
+        parsed = OpenAIService._parse_json_list(OpenAIService._response_text(response), len(chunk))
+        
+        values_by_key = {}
+        invalid_count = 0
+        for (cache_key, vehicle_info), values in zip(chunk, parsed):
+            # Validate each entry has the required keys, falling back per vehicle
+            if isinstance(values, dict) and "LIMITES" in values and "DEDUCIBLES" in values:
+                insurance_values = InsuranceValues(LIMITES=str(values["LIMITES"]), DEDUCIBLES=str(values["DEDUCIBLES"]))
+                _remember(_insurance_values_cache, cache_key, insurance_values)
+            else:
+                logger.debug("Invalid insurance values for %r, using fallback values", vehicle_info.description)
+                invalid_count += 1
+                insurance_values = OpenAIService._get_fallback_values(vehicle_info.type)
+            values_by_key[cache_key] = insurance_values
+        
+        if invalid_count:
+            logger.warning(f"OpenAI returned invalid insurance values for {invalid_count} vehicles, using fallback values")
+        return values_by_key
+    
+    @staticmethod
+    def _fallback_insurance_values(chunk: List[Tuple[Tuple, VehicleInfo]]) -> Dict[Tuple, InsuranceValues]:
+        """Value a batch of vehicles with the default fallback values"""
+        return {
+            cache_key: OpenAIService._get_fallback_values(vehicle_info.type)
+            for cache_key, vehicle_info in chunk
+        }
+    
+    @staticmethod
+    def _classification_cache_key(vehicle_description: str, available_types: List[str]) -> Tuple[str, Tuple[str, ...]]:
+        """Build the memo key for a classification request, ignoring case and surrounding whitespace"""
+        return (vehicle_description.strip().upper(), tuple(available_types))
+    
+    @staticmethod
+    def _insurance_cache_key(vehicle_info: VehicleInfo, coverage_type: str) -> Tuple[str, str, str, str, str]:
+        """Build the memo key for an insurance values request, ignoring case and surrounding whitespace"""
+        return (
+            vehicle_info.description.strip().upper(),
+            vehicle_info.type,
+            vehicle_info.year,
+            vehicle_info.model,
+            coverage_type
+        )
+    
+    @staticmethod
+    def _build_vehicle_context(vehicle_info: VehicleInfo) -> str:
+        """Build the vehicle description line used in insurance prompts"""
+        vehicle_context = f"Vehicle: {vehicle_info.description}"
+        if vehicle_info.year:
+            vehicle_context += f", Year: {vehicle_info.year}"
+        if vehicle_info.model:
+            vehicle_context += f", Model: {vehicle_info.model}"
+        return vehicle_context
+    
+    @staticmethod
+    def _json_output_options(function: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Build the chat completion arguments that make the model return JSON"""
+        if function is not None and settings.OPENAI_USE_FUNCTIONS:
+            # Force a call to the function so the values arrive as its JSON arguments
+            return {
+                "tools": [{"type": "function", "function": function}],
+                "tool_choice": {"type": "function", "function": {"name": function["name"]}}
+            }
+        if settings.OPENAI_RESPONSE_FORMAT:
+            return {"response_format": settings.OPENAI_RESPONSE_FORMAT}
+        return {}
+    
+    @staticmethod
+    def _response_text(response) -> str:
+        """Return the JSON text of a response, from the function call if one was made"""
+        message = response.choices[0].message
+        if message.tool_calls:
+            return message.tool_calls[0].function.arguments
+        return message.content
+    
+    @staticmethod
+    def _delta_text(delta) -> Optional[str]:
+        """Return the JSON text carried by a streamed delta, from the function call if one is made"""
+        if delta.tool_calls:
+            return delta.tool_calls[0].function.arguments
+        return delta.content
+    
+    @staticmethod
+    def _read_streamed_json(stream) -> Any:
+        """
+        Accumulate a streamed completion and parse it as soon as it forms complete JSON.
+        The JSON is read from the function call arguments when the model answers with
+        a function call.
+        """
+        buffer = io.StringIO()
+        for chunk in stream:
+            content = OpenAIService._delta_text(chunk.choices[0].delta) if chunk.choices else None
+            if not content:
+                continue
+            
+            buffer.write(content)
+            if "}" in content:
+                try:
+                    values = OpenAIService._parse_json_response(buffer.getvalue())
+                except ValueError:
+                    # Not complete yet, e.g. a nested object closed
+                    continue
+                
+                # Read the rest of the stream (finish reason and [DONE]) so the
+                # kept-alive connection goes back to the pool instead of being dropped
+                for _ in stream:
+                    pass
+                return values
+        
+        return OpenAIService._parse_json_response(buffer.getvalue())
+    
+    @staticmethod
+    def _parse_json_response(response_text: str):
+        """Parse a JSON response, stripping any markdown code fences"""
+        response_text = response_text.strip()
+        
+        # Clean up the response to ensure it's valid JSON; only the ends can hold a fence
+        if response_text.startswith("```"):
+            response_text = response_text.strip("`")
+            if response_text.startswith("json"):
+                response_text = response_text[4:]
+        
+        return orjson.loads(response_text)
+    
+    @staticmethod
+    def _parse_json_list(response_text: str, expected_length: int) -> list:
+        """Parse a batched JSON response and check it has one entry per input"""
+        parsed = OpenAIService._parse_json_response(response_text)
+        
+        # Accept an array wrapped in an object, e.g. {"results": [...]}
+        if isinstance(parsed, dict):
+            parsed = next((value for value in parsed.values() if isinstance(value, list)), None)
+        
+        if not isinstance(parsed, list) or len(parsed) != expected_length:
+            raise ValueError(f"Expected a JSON array with {expected_length} entries from OpenAI")
+        
+        return parsed
+    
     @staticmethod
     def _get_fallback_values(vehicle_type: str) -> InsuranceValues:
         """Get fallback insurance values when OpenAI is not available"""
@@ -222,13 +798,25 @@ class OpenAIService:
                 DEDUCIBLES="6.0 %"
             )
     
+    @staticmethod
+    def _keyword_classification(vehicle_description: str, available_types: List[str]) -> Optional[str]:
+        """
+        Classify a description that names its vehicle type outright, the same way
+        the batch enrichment pre-classifies rows. Returns None when it is ambiguous.
+        """
+        vehicle_upper = vehicle_description.upper()
+        if _TRACTO_RE.search(vehicle_upper):
+            vehicle_type = "TRACTOS"
+        elif _REMOLQUE_RE.search(vehicle_upper):
+            vehicle_type = "REMOLQUES"
+        else:
+            return None
+        return vehicle_type if vehicle_type in available_types else None
+    
     @staticmethod
     def _fallback_classification(vehicle_description: str, available_types: List[str]) -> str:
         """Fallback rule-based classification when OpenAI is not available"""
-        vehicle_upper = vehicle_description.upper().strip()
-        if "TRACTO" in vehicle_upper:
-            return "TRACTOS"
-        elif any(keyword in vehicle_upper for keyword in ["TANQUE", "REMOLQUE", "DOLLY", "SEMI"]):
+        vehicle_upper = vehicle_description.upper()
+        if _REMOLQUE_RE.search(vehicle_upper) and not _TRACTO_RE.search(vehicle_upper):
             return "REMOLQUES"
-        else:
-            return "TRACTOS"
+        return "TRACTOS"
@@ -0,0 +1,84 @@
+"""
+Request and token throttling for concurrent OpenAI calls
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable
+from openai import APIConnectionError, InternalServerError, RateLimitError
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Admit OpenAI requests only while both the requests-per-minute and the
+    tokens-per-minute budgets allow it, refilling both capacities continuously
+    """
+
+    def __init__(self, max_requests_per_minute: int, max_tokens_per_minute: int):
+        self.max_requests_per_minute = max_requests_per_minute
+        self.max_tokens_per_minute = max_tokens_per_minute
+        self.available_request_capacity = float(max_requests_per_minute)
+        self.available_token_capacity = float(max_tokens_per_minute)
+        self.last_update_time = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self) -> float:
+        """Add the capacity earned since the last update and return the current time"""
+        now = time.monotonic()
+        elapsed = now - self.last_update_time
+        self.available_request_capacity = min(
+            self.available_request_capacity + self.max_requests_per_minute * elapsed / 60.0,
+            self.max_requests_per_minute
+        )
+        self.available_token_capacity = min(
+            self.available_token_capacity + self.max_tokens_per_minute * elapsed / 60.0,
+            self.max_tokens_per_minute
+        )
+        self.last_update_time = now
+        return now
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        """
+        Wait until one request and the estimated tokens fit in the budgets, then reserve them
+        """
+        estimated_tokens = min(estimated_tokens, self.max_tokens_per_minute)
+        while True:
+            now = self._refill()
+            if (
+                now >= self.paused_until
+                and self.available_request_capacity >= 1
+                and self.available_token_capacity >= estimated_tokens
+            ):
+                self.available_request_capacity -= 1
+                self.available_token_capacity -= estimated_tokens
+                return
+            await asyncio.sleep(0.001)
+
+    async def run(self, make_request: Callable[[], Awaitable[Any]], estimated_tokens: int) -> Any:
+        """
+        Send a request once the budgets allow it, backing off exponentially on rate limit
+        and transient connection or server errors. This is the only retry policy for the
+        requests it sends, so the client they go through must not retry on its own.
+        """
+        delay = settings.OPENAI_RATE_LIMIT_BACKOFF
+        for attempt in range(settings.OPENAI_RATE_LIMIT_RETRIES + 1):
+            await self.acquire(estimated_tokens)
+            try:
+                return await make_request()
+            except RateLimitError:
+                if attempt == settings.OPENAI_RATE_LIMIT_RETRIES:
+                    raise
+                logger.warning(f"OpenAI rate limit hit, pausing requests for {delay:.1f}s")
+                # Pause every caller, not just this one, since the shared budget is exhausted
+                self.paused_until = max(self.paused_until, time.monotonic() + delay)
+            except (APIConnectionError, InternalServerError) as e:
+                if attempt == settings.OPENAI_RATE_LIMIT_RETRIES:
+                    raise
+                logger.warning(f"OpenAI request failed ({str(e)}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+            delay *= 2
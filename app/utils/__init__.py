@@ -3,8 +3,13 @@ Utilities package for the Excel AI Modifier application
 """
 
 from .excel_utils import (
+    save_upload_to_temp_file,
     detect_header_row,
+    build_column_names,
+    read_sheet_header,
+    read_sheet_dataframe,
     find_column_mapping,
+    build_column_map,
     extract_vehicle_info,
     validate_excel_file,
     get_sheet_names
@@ -14,21 +19,26 @@ from .formatting_utils import (
     copy_cell_style,
     apply_cell_style,
     auto_adjust_column_widths,
-    get_data_row_styles,
+    get_data_row_style_arrays,
     clear_data_rows,
     find_original_table_end
 )
 
 __all__ = [
+    "save_upload_to_temp_file",
     "detect_header_row",
+    "build_column_names",
+    "read_sheet_header",
+    "read_sheet_dataframe",
     "find_column_mapping", 
+    "build_column_map",
     "extract_vehicle_info",
     "validate_excel_file",
     "get_sheet_names",
     "copy_cell_style",
     "apply_cell_style",
     "auto_adjust_column_widths",
-    "get_data_row_styles",
+    "get_data_row_style_arrays",
     "clear_data_rows",
     "find_original_table_end"
 ]
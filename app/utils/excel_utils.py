@@ -3,15 +3,47 @@ Excel processing utilities
 """
 
 import pandas as pd
-import io
+import os
+import re
+import shutil
+import tempfile
 import logging
-from typing import Dict, Any, List
+from typing import BinaryIO, Dict, Any, List, Optional, Sequence, Tuple, Union
+from openpyxl.workbook.workbook import Workbook
+from openpyxl.worksheet.worksheet import Worksheet
 from ..core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Column name keywords that identify vehicle year/model columns
+YEAR_COLUMN_KEYWORDS = ["YEAR", "AÑO"]
+MODEL_COLUMN_KEYWORDS = ["MOD", "MODELO"]
+_YEAR_COLUMN_RE = re.compile("|".join(YEAR_COLUMN_KEYWORDS))
+_MODEL_COLUMN_RE = re.compile("|".join(MODEL_COLUMN_KEYWORDS))
 
-def detect_header_row(file_content: bytes, sheet_name: str, target_column: str = None) -> int:
+# Four-digit vehicle year inside a description, e.g. "TRACTO KENWORTH 2019"
+YEAR_PATTERN = r"\b((?:19|20)\d{2})\b"
+_YEAR_RE = re.compile(YEAR_PATTERN)
+
+# Error detail returned for uploads with an unsupported extension
+UNSUPPORTED_FILE_MESSAGE = f"Only {', '.join(sorted(settings.SUPPORTED_FILE_EXTENSIONS))} files are supported"
+
+
+def save_upload_to_temp_file(source: BinaryIO, suffix: str = ".xlsx") -> str:
+    """
+    Stream an uploaded file to a temporary file on disk and return its path
+    """
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    try:
+        with temp_file:
+            shutil.copyfileobj(source, temp_file, length=settings.UPLOAD_CHUNK_SIZE)
+    except Exception:
+        os.unlink(temp_file.name)
+        raise
+    return temp_file.name
+
+
+def detect_header_row(worksheet: Worksheet, target_column: str = None) -> int:
     """
     Detect which row contains the actual headers by looking for the target column
     """
@@ -19,39 +51,30 @@ def detect_header_row(file_content: bytes, sheet_name: str, target_column: str =
         target_column = settings.TARGET_COLUMN
         
     try:
-        # Try reading first few rows to find headers
-        for header_row in range(0, settings.MAX_HEADER_SEARCH_ROWS):
-            try:
-                df_test = pd.read_excel(
-                    io.BytesIO(file_content), 
-                    sheet_name=sheet_name, 
-                    header=header_row,
-                    nrows=1  # Only read first data row to check headers
-                )
+        # Scan the first few rows of the already loaded worksheet to find headers
+        candidate_rows = worksheet.iter_rows(max_row=settings.MAX_HEADER_SEARCH_ROWS, values_only=True)
+        for header_row, header_values in enumerate(candidate_rows):
+            columns = build_column_names(header_values)
+            
+            # Check if target column exists in this header configuration
+            if target_column in columns:
+                logger.info(f"Found header row at index {header_row}")
+                return header_row
                 
-                # Check if target column exists in this header configuration
-                if target_column in df_test.columns:
-                    logger.info(f"Found header row at index {header_row}")
+            # Also check for similar column names (case insensitive, with variations)
+            column_variations = [
+                target_column.upper(),
+                target_column.lower(), 
+                target_column.title(),
+                target_column.replace(" ", "_"),
+                target_column.replace("_", " ")
+            ]
+            
+            for col in columns:
+                col_clean = str(col).strip()
+                if any(var in col_clean.upper() for var in [v.upper() for v in column_variations]):
+                    logger.info(f"Found similar header '{col}' at row {header_row}")
                     return header_row
-                    
-                # Also check for similar column names (case insensitive, with variations)
-                column_variations = [
-                    target_column.upper(),
-                    target_column.lower(), 
-                    target_column.title(),
-                    target_column.replace(" ", "_"),
-                    target_column.replace("_", " ")
-                ]
-                
-                for col in df_test.columns:
-                    col_clean = str(col).strip()
-                    if any(var in col_clean.upper() for var in [v.upper() for v in column_variations]):
-                        logger.info(f"Found similar header '{col}' at row {header_row}")
-                        return header_row
-                        
-            except Exception as e:
-                logger.debug(f"Error testing header row {header_row}: {str(e)}")
-                continue
                 
         # Default to configured default if not found
         logger.warning(f"Could not find '{target_column}' column, defaulting to header row {settings.DEFAULT_HEADER_ROW}")
@@ -62,77 +85,151 @@ def detect_header_row(file_content: bytes, sheet_name: str, target_column: str =
         return 0  # Default to first row
 
 
-def find_column_mapping(df: pd.DataFrame, target_column: str) -> str:
+def build_column_names(header_values: Sequence[Any]) -> List[Any]:
     """
-    Find the actual column name that matches the target column (with fuzzy matching)
+    Build DataFrame column names from a header row, naming blank headers
+    and de-duplicating repeated ones the same way pandas.read_excel does
     """
+    columns = []
+    seen = {}
+    for position, value in enumerate(header_values):
+        name = value if value is not None and str(value).strip() else f"Unnamed: {position}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+
+def read_sheet_header(worksheet: Worksheet, header_row: int) -> List[Any]:
+    """
+    Read the column names of a worksheet, using the given 0-based header row
+    """
+    header_values = next(
+        worksheet.iter_rows(min_row=header_row + 1, max_row=header_row + 1, values_only=True), ()
+    )
+    return build_column_names(header_values)
+
+
+def read_sheet_dataframe(worksheet: Worksheet, header_row: int, usecols: Sequence[Any] = None) -> pd.DataFrame:
+    """
+    Build a DataFrame from a loaded worksheet, using the given 0-based header row.
+    When usecols is given, only those columns are kept while streaming the rows.
+    """
+    rows = worksheet.iter_rows(min_row=header_row + 1, values_only=True)
+    header_values = list(next(rows, ()))
+    columns = build_column_names(header_values)
+    selected = None if usecols is None else [columns.index(col) for col in usecols]
+    
+    data = []
+    last_non_empty = 0
+    for row in rows:
+        if selected is None:
+            data.append(list(row))
+        else:
+            data.append([row[position] if position < len(row) else None for position in selected])
+        if any(value is not None and value != "" for value in row):
+            last_non_empty = len(data)
+    
+    # Drop trailing empty rows, which openpyxl reports for formatted but blank cells
+    del data[last_non_empty:]
+    
+    if selected is not None:
+        columns = [columns[position] for position in selected]
+    else:
+        width = max([len(header_values)] + [len(row) for row in data])
+        columns = build_column_names(header_values + [None] * (width - len(header_values)))
+    
+    # Back typed columns with Arrow arrays; mixed-type columns stay as objects
+    return pd.DataFrame(data, columns=columns).convert_dtypes(dtype_backend="pyarrow")
+
+
+def find_column_mapping(df: Union[pd.DataFrame, Sequence[Any]], target_column: str) -> str:
+    """
+    Find the actual column name that matches the target column (with fuzzy matching).
+    Accepts a DataFrame or a sequence of column names.
+    """
+    columns = df.columns if isinstance(df, pd.DataFrame) else list(df)
+    
     # Direct match
-    if target_column in df.columns:
+    if target_column in columns:
         return target_column
     
     # Case insensitive match
-    for col in df.columns:
+    for col in columns:
         if str(col).upper().strip() == target_column.upper().strip():
             return col
     
     # Fuzzy match - look for key words
     target_words = target_column.upper().split()
-    for col in df.columns:
+    for col in columns:
         col_upper = str(col).upper()
         if all(word in col_upper for word in target_words):
             logger.info(f"Mapped '{target_column}' to '{col}' using fuzzy matching")
             return col
     
     # Look for partial matches
-    for col in df.columns:
+    for col in columns:
         col_upper = str(col).upper()
         if "TIPO" in col_upper and "UNIDAD" in col_upper:
             logger.info(f"Mapped '{target_column}' to '{col}' using partial matching")
             return col
     
-    raise ValueError(f"Could not find column matching '{target_column}'. Available columns: {list(df.columns)}")
+    raise ValueError(f"Could not find column matching '{target_column}'. Available columns: {list(columns)}")
 
 
-def extract_vehicle_info(row: pd.Series, df: pd.DataFrame) -> Dict[str, str]:
+def build_column_map(df: Union[pd.DataFrame, Sequence[Any]]) -> Tuple[Optional[Any], Optional[Any]]:
     """
-    Extract vehicle information (year, model) from a DataFrame row
+    Resolve the vehicle year and model columns once, returning (year_col, model_col).
+    Accepts a DataFrame or a sequence of column names; missing columns are None.
     """
-    year = ""
-    model = ""
+    columns = df.columns if isinstance(df, pd.DataFrame) else list(df)
     
-    # Try to find year and model columns
-    for col in df.columns:
-        col_upper = str(col).upper()
-        if any(keyword in col_upper for keyword in ["MOD", "YEAR", "AÑO", "MODELO"]):
-            if not model:
-                model = str(row[col]).strip()
-        elif any(keyword in col_upper for keyword in ["YEAR", "AÑO"]) and col_upper != model:
-            year = str(row[col]).strip()
+    year_col = next((col for col in columns if _YEAR_COLUMN_RE.search(str(col).upper())), None)
+    model_col = next(
+        (col for col in columns if col != year_col and _MODEL_COLUMN_RE.search(str(col).upper())),
+        None
+    )
+    return year_col, model_col
+
+
+def extract_vehicle_info(
+    row: Dict[str, Any],
+    year_col: Optional[Any],
+    model_col: Optional[Any],
+    description: str = ""
+) -> Dict[str, str]:
+    """
+    Extract vehicle information (year, model) from a row, using the columns from build_column_map
+    """
+    year = _cell_text(row[year_col]) if year_col is not None else ""
+    model = _cell_text(row[model_col]) if model_col is not None else ""
     
-    # If year is in the description, try to extract it
-    if not year and 'vehicle_description' in locals():
-        import re
-        year_match = re.search(r'\b(19|20)\d{2}\b', str(row.iloc[0]))
+    # If there is no year column value, try to extract the year from the description
+    if not year and description:
+        year_match = _YEAR_RE.search(description)
         if year_match:
             year = year_match.group()
     
     return {"year": year, "model": model}
 
 
+def _cell_text(value: Any) -> str:
+    """Convert a cell value to stripped text, with empty cells as an empty string"""
+    return "" if pd.isna(value) else str(value).strip()
+
+
 def validate_excel_file(filename: str) -> bool:
     """
     Validate if the file is a supported Excel format
     """
-    return any(filename.endswith(ext) for ext in settings.SUPPORTED_FILE_EXTENSIONS)
+    return os.path.splitext(filename)[1] in settings.SUPPORTED_FILE_EXTENSIONS
 
 
-def get_sheet_names(file_content: bytes) -> List[str]:
+def get_sheet_names(workbook: Workbook) -> List[str]:
     """
-    Get all sheet names from an Excel file
+    Get all sheet names from a loaded Excel workbook
     """
-    try:
-        excel_data = pd.ExcelFile(io.BytesIO(file_content))
-        return excel_data.sheet_names
-    except Exception as e:
-        logger.error(f"Error reading Excel file: {str(e)}")
-        return []
+    return list(workbook.sheetnames)
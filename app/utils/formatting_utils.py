@@ -19,7 +19,8 @@ def copy_cell_style(source_cell):
         'font': copy.copy(source_cell.font) if source_cell.font else Font(),
         'fill': copy.copy(source_cell.fill) if source_cell.fill else PatternFill(),
         'border': copy.copy(source_cell.border) if source_cell.border else Border(),
-        'alignment': copy.copy(source_cell.alignment) if source_cell.alignment else Alignment()
+        'alignment': copy.copy(source_cell.alignment) if source_cell.alignment else Alignment(),
+        'number_format': source_cell.number_format
     }
 
 
@@ -31,6 +32,7 @@ def apply_cell_style(cell, style_dict):
     cell.fill = style_dict['fill']
     cell.border = style_dict['border']
     cell.alignment = style_dict['alignment']
+    cell.number_format = style_dict['number_format']
 
 
 def auto_adjust_column_widths(worksheet, start_col: int, end_col: int, width: int = None):
@@ -46,25 +48,43 @@ def auto_adjust_column_widths(worksheet, start_col: int, end_col: int, width: in
         logger.debug(f"Set column {col_letter} width to {width}")
 
 
-def get_data_row_styles(worksheet, data_start_row: int, original_table_end_col: int):
+def get_data_row_style_arrays(worksheet, data_start_row: int, original_table_end_col: int):
     """
-    Extract styles from the first data row for copying to new rows
+    Extract the style arrays of the first data row, by column. A style array holds the
+    workbook's font/fill/border/alignment/format ids, so copying it onto a cell applies
+    the same formatting without adding styles to the workbook.
+    Columns with the same formatting share one style array.
     """
-    data_row_styles = {}
+    data_row_style_arrays = {}
+    interned_styles = {}
     if worksheet.max_row >= data_start_row:
         for col_idx in range(1, original_table_end_col + 1):
             sample_cell = worksheet.cell(row=data_start_row, column=col_idx)
-            data_row_styles[col_idx] = copy_cell_style(sample_cell)
-    return data_row_styles
+            style_key = tuple(sample_cell._style)
+            if style_key not in interned_styles:
+                interned_styles[style_key] = copy.copy(sample_cell._style)
+            data_row_style_arrays[col_idx] = interned_styles[style_key]
+    return data_row_style_arrays
 
 
-def clear_data_rows(worksheet, data_start_row: int, max_row: int, max_col: int):
+def clear_data_rows(worksheet, data_start_row: int, max_row: int, max_col: int, min_col: int = 1):
     """
     Clear data rows while preserving headers
     """
-    for row in range(data_start_row, max_row + 1):
-        for col in range(1, max_col):
-            worksheet.cell(row=row, column=col).value = None
+    if max_row - data_start_row + 1 > settings.BULK_CLEAR_MIN_ROWS:
+        # Large ranges: clear only the cells the worksheet actually stores, in one pass over
+        # its cell map, instead of looking up (and creating) a cell at every position
+        for (row, col), cell in worksheet._cells.items():
+            if data_start_row <= row <= max_row and min_col <= col < max_col:
+                cell.value = None
+    else:
+        # Look up only positions that hold a cell; blank positions need no clearing
+        stored_cells = worksheet._cells
+        for row in range(data_start_row, max_row + 1):
+            for col in range(min_col, max_col):
+                cell = stored_cells.get((row, col))
+                if cell is not None:
+                    cell.value = None
     logger.info(f"Cleared data rows from {data_start_row} to {max_row}")
 
 
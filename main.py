@@ -3,14 +3,9 @@ FastAPI backend for Excel Viewer & AI Modifier
 Main entry point - imports the modular application
 """
 
-import logging
 from app.main import app
 from app.core.config import settings
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
 
 if __name__ == "__main__":
     import uvicorn